@@ -3,36 +3,104 @@
 Calculate the optimal center point and zoom level for the Melbourne map
 """
 
-import json
 import math
+import os
+
+import numpy as np
+
+from map_utils import (
+    ZOOM_LEVELS,
+    ZOOM_SPAN_THRESHOLDS,
+    dump_json,
+    file_digest,
+    load_json,
+    parse_args,
+    zoom_for_span,
+)
+
+BOUNDS_PATH = 'zipcode_bound_info.json'
+CACHE_PATH = os.path.join('.cache', 'center.json')
+
+# Bump when the aggregation or the cached summary format changes
+CENTER_CACHE_VERSION = 2
+
+# Fields stored in the cached boundary summary
+SUMMARY_FIELDS = {
+    'region_count', 'min_lng', 'max_lng', 'min_lat', 'max_lat',
+    'lng_span', 'lat_span', 'center_lat', 'center_lng', 'zoom',
+}
+
+def center_cache_key():
+    """Cache key covering the boundary file contents and the zoom calculation"""
+    return {
+        'version': CENTER_CACHE_VERSION,
+        'bounds': file_digest(BOUNDS_PATH),
+        'zoom_thresholds': ZOOM_SPAN_THRESHOLDS.tolist(),
+        'zoom_levels': ZOOM_LEVELS.tolist(),
+    }
+
+def load_cached_summary(key):
+    """Return the cached boundary summary for key, or None if it is missing, stale or unreadable"""
+    if not os.path.exists(CACHE_PATH):
+        return None
+    try:
+        cache = load_json(CACHE_PATH)
+    except ValueError as e:
+        print(f"[WARN] Ignoring unreadable {CACHE_PATH}: {e}")
+        return None
+    if not isinstance(cache, dict) or cache.get('key') != key:
+        return None
+    summary = cache.get('summary')
+    if not isinstance(summary, dict) or not SUMMARY_FIELDS <= summary.keys():
+        return None
+    return summary
+
+def print_boundary_analysis(summary):
+    """Print the geographic boundary analysis for a computed summary"""
+    print("\n=== Geographic Boundary Analysis ===")
+    print(f"Longitude range: {summary['min_lng']:.6f} to {summary['max_lng']:.6f}")
+    print(f"Latitude range: {summary['min_lat']:.6f} to {summary['max_lat']:.6f}")
+    print(f"Longitude span: {summary['lng_span']:.6f}°")
+    print(f"Latitude span: {summary['lat_span']:.6f}°")
+    print(f"Suggested center point: ({summary['center_lat']:.6f}, {summary['center_lng']:.6f})")
+    print(f"Suggested zoom level: {summary['zoom']}")
 
 def calculate_center_and_bounds():
-    """Calculate the geographic center and boundaries of Melbourne data"""
+    """Calculate the geographic center and boundaries of Melbourne data
+
+    The summary is cached in .cache/center.json, keyed on a hash of the
+    boundary file and the zoom table, so reruns on unchanged inputs skip
+    the load and aggregation.
+    """
+    key = center_cache_key()
+    summary = load_cached_summary(key)
+    if summary is not None:
+        print(f"Using cached analysis of {summary['region_count']} Melbourne SA2 regions from {CACHE_PATH}")
+        print_boundary_analysis(summary)
+        return summary['center_lat'], summary['center_lng'], summary['zoom']
     
     # Read boundary information
-    with open('zipcode_bound_info.json', 'r', encoding='utf-8') as f:
-        bounds_data = json.load(f)
+    bounds_data = load_json(BOUNDS_PATH)
     
     regions = bounds_data['data']
     
     print(f"Analyzing {len(regions)} Melbourne SA2 regions...")
     
-    # Collect all boundary points
-    all_lngs = []
-    all_lats = []
-    
-    for region_name, bounds in regions.items():
-        # bounds format: [min_lng, min_lat, max_lng, max_lat, center_lng, center_lat]
-        min_lng, min_lat, max_lng, max_lat, center_lng, center_lat = bounds
-        
-        all_lngs.extend([min_lng, max_lng])
-        all_lats.extend([min_lat, max_lat])
+    # Collect all boundary points into an (N, 4) array
+    # bounds format: [min_lng, min_lat, max_lng, max_lat, center_lng, center_lat]
+    arr = np.fromiter(
+        (v for bounds in regions.values() for v in bounds[:4]),
+        dtype=np.float64,
+        count=len(regions) * 4,
+    ).reshape(-1, 4)
     
     # Calculate overall boundary
-    overall_min_lng = min(all_lngs)
-    overall_max_lng = max(all_lngs)
-    overall_min_lat = min(all_lats)
-    overall_max_lat = max(all_lats)
+    mins = arr.min(axis=0)
+    maxs = arr.max(axis=0)
+    overall_min_lng = float(mins[0])
+    overall_min_lat = float(mins[1])
+    overall_max_lng = float(maxs[2])
+    overall_max_lat = float(maxs[3])
     
     # Calculate center point
     center_lng = (overall_min_lng + overall_max_lng) / 2
@@ -42,42 +110,37 @@ def calculate_center_and_bounds():
     lng_span = overall_max_lng - overall_min_lng
     lat_span = overall_max_lat - overall_min_lat
     
-    print("\n=== Geographic Boundary Analysis ===")
-    print(f"Longitude range: {overall_min_lng:.6f} to {overall_max_lng:.6f}")
-    print(f"Latitude range: {overall_min_lat:.6f} to {overall_max_lat:.6f}")
-    print(f"Longitude span: {lng_span:.6f}°")
-    print(f"Latitude span: {lat_span:.6f}°")
-    print(f"Suggested center point: ({center_lat:.6f}, {center_lng:.6f})")
-    
     # Estimate appropriate zoom level based on span
     # Google Maps zoom level estimation formula
     max_span = max(lng_span, lat_span)
     
-    if max_span > 10:
-        zoom = 8
-    elif max_span > 5:
-        zoom = 9
-    elif max_span > 2:
-        zoom = 10
-    elif max_span > 1:
-        zoom = 11
-    elif max_span > 0.5:
-        zoom = 12
-    elif max_span > 0.2:
-        zoom = 13
-    elif max_span > 0.1:
-        zoom = 14
-    else:
-        zoom = 15
-    
-    print(f"Suggested zoom level: {zoom}")
+    zoom = zoom_for_span(max_span)
+    
+    summary = {
+        'region_count': len(regions),
+        'min_lng': overall_min_lng,
+        'max_lng': overall_max_lng,
+        'min_lat': overall_min_lat,
+        'max_lat': overall_max_lat,
+        'lng_span': lng_span,
+        'lat_span': lat_span,
+        'center_lat': center_lat,
+        'center_lng': center_lng,
+        'zoom': zoom,
+    }
+    print_boundary_analysis(summary)
+    
+    # Write to a temp file first so an interrupted run never leaves a truncated cache
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = CACHE_PATH + '.tmp'
+    dump_json({'key': key, 'summary': summary}, tmp_path)
+    os.replace(tmp_path, CACHE_PATH)
     
     return center_lat, center_lng, zoom
 
 def show_region_examples():
     """Show some region examples"""
-    with open('zipcode_metadata.json', 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
+    metadata = load_json('zipcode_metadata.json')
     
     print("\n=== Included Melbourne Regions ===")
     for region_name, population in metadata.items():
@@ -85,6 +148,7 @@ def show_region_examples():
 
 def main():
     """Main function"""
+    parse_args(__doc__)
     print("Calculating Melbourne map configuration...")
     
     # Show region information
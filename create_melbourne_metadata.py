@@ -4,104 +4,42 @@ Create Melbourne metadata files
 Convert API data into the format of zipcode_metadata.json
 """
 
-import json
-import requests
 import os
 
+import numpy as np
+
+from map_utils import dump_json, fetch_json, load_json, parse_args
+
 API_URL = os.getenv("POP_API_URL", "https://vic-population-api.onrender.com/melbourne-city")
 LOCAL_JSON = "melbourne_api_data.json"
 
+def _check_api_data(data):
+    if not data or "sa2_name" not in data[0]:
+        raise ValueError("API response structure does not contain 'sa2_name'")
+
 def load_api_data():
     """
     Prefer to fetch data from the online API; fallback to local melbourne_api_data.json if failed
     Expected API returns each record containing fields:
     sa2_name, area_km2, y2001...y2021
     """
-    print(f"[INFO] Fetching API: {API_URL}")
-    r = requests.get(API_URL, timeout=20)
-    r.raise_for_status()
-    data = r.json()
-
-    if not data or "sa2_name" not in data[0]:
-        raise ValueError("API response structure does not contain 'sa2_name'")
-
-    with open(LOCAL_JSON, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"[INFO] Written to {LOCAL_JSON}, records: {len(data)}")
+    data = fetch_json(API_URL, LOCAL_JSON, timeout=20, validate=_check_api_data)
+    print(f"[INFO] API records: {len(data)}")
 
     return data
     
-def create_metadata_from_latest_year(api_data):
-    """Create metadata using the latest year's population data"""
-    print("=== Creating population metadata ===")
-    
-    metadata = {}
-    
-    # Find the latest year column
-    year_columns = [col for col in api_data[0].keys() if col.startswith('y')]
-    latest_year = max(year_columns)
-    
-    print(f"Using population data from year {latest_year}")
-    
-    for region in api_data:
-        sa2_name = region['sa2_name']
-        population = region[latest_year]
-        
-        metadata[sa2_name] = population
-    
-    # Save metadata file
-    with open('melbourne_population_metadata.json', 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    
-    print(f"Population metadata saved, contains {len(metadata)} SA2 regions")
-    print(f"Population range: {min(metadata.values())} - {max(metadata.values())} people")
-    
-    return metadata
-
-def create_density_metadata(api_data):
-    """Create population density metadata"""
-    print("\n=== Creating population density metadata ===")
-    
-    metadata = {}
-    
-    # Find the latest year column
-    year_columns = [col for col in api_data[0].keys() if col.startswith('y')]
-    latest_year = max(year_columns)
-    
-    for region in api_data:
-        sa2_name = region['sa2_name']
-        population = region[latest_year]
-        area_km2 = region['area_km2']
-        
-        # Calculate population density (people/km²)
-        if area_km2 > 0:
-            density = population / area_km2
-        else:
-            density = 0
-        
-        metadata[sa2_name] = round(density, 2)
-    
-    # Save density metadata file
-    with open('melbourne_density_metadata.json', 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    
-    print(f"Density metadata saved, contains {len(metadata)} SA2 regions")
-    print(f"Density range: {min(metadata.values())} - {max(metadata.values())} people/km²")
-    
-    return metadata
-
-def analyze_data_coverage(api_data, bounds_data):
+def analyze_data_coverage(api_names, bounds_data):
     """Analyze data coverage"""
     print("\n=== Data coverage analysis ===")
     
     # SA2 names in API
-    api_sa2_names = set(region['sa2_name'] for region in api_data)
+    api_sa2_names = set(api_names)
     
-    # SA2 names in Shapefile
-    shapefile_sa2_names = set(bounds_data['data'].keys())
+    # SA2 names in Shapefile (dict keys view already supports set operations)
+    shapefile_sa2_names = bounds_data['data'].keys()
     
     # Intersection
-    common_names = api_sa2_names.intersection(shapefile_sa2_names)
+    common_names = api_sa2_names & shapefile_sa2_names
     
     # Differences
     api_only = api_sa2_names - shapefile_sa2_names
@@ -126,47 +64,48 @@ def analyze_data_coverage(api_data, bounds_data):
     # Create metadata containing only matched regions
     return common_names
 
-def create_matched_metadata(api_data, common_names):
-    """Create metadata containing only matched regions"""
-    print("\n=== Creating matched metadata ===")
-    
-    # Population data
-    population_metadata = {}
-    density_metadata = {}
-    
-    year_columns = [col for col in api_data[0].keys() if col.startswith('y')]
-    latest_year = max(year_columns)
-    
-    for region in api_data:
-        sa2_name = region['sa2_name']
-        
-        if sa2_name in common_names:
-            population = region[latest_year]
-            area_km2 = region['area_km2']
-            
-            population_metadata[sa2_name] = population
-            
-            if area_km2 > 0:
-                density = population / area_km2
-            else:
-                density = 0
-            
-            density_metadata[sa2_name] = round(density, 2)
+def build_all_metadata(api_data, api_names, common_names, latest_year):
+    """Create full and matched population/density metadata"""
+    print("\n=== Creating population and density metadata ===")
+    
+    print(f"Using population data from year {latest_year}")
+    
+    pops = [region[latest_year] for region in api_data]
+    areas = np.array([region['area_km2'] for region in api_data], dtype=np.float64)
+    
+    # Calculate population density (people/km²), 0 where the area is missing
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dens = np.where(areas > 0, np.array(pops, dtype=np.float64) / areas, 0.0)
+    dens = dens.round(2).tolist()
+    
+    full_pop = dict(zip(api_names, pops))
+    full_dens = dict(zip(api_names, dens))
+    matched_pop = {name: full_pop[name] for name in full_pop if name in common_names}
+    matched_dens = {name: full_dens[name] for name in full_dens if name in common_names}
     
     # Save matched metadata files
-    with open('zipcode_metadata.json', 'w', encoding='utf-8') as f:
-        json.dump(population_metadata, f, indent=2, ensure_ascii=False)
+    dump_json(matched_pop, 'zipcode_metadata.json')
+    
+    dump_json(matched_dens, 'melbourne_density_matched.json')
+    
+    print(f"Matched population metadata saved to zipcode_metadata.json: {len(matched_pop)} regions")
+    print(f"Matched density metadata saved to melbourne_density_matched.json: {len(matched_dens)} regions")
+    
+    # Also save complete metadata for reference
+    dump_json(full_pop, 'melbourne_population_metadata.json')
     
-    with open('melbourne_density_matched.json', 'w', encoding='utf-8') as f:
-        json.dump(density_metadata, f, indent=2, ensure_ascii=False)
+    dump_json(full_dens, 'melbourne_density_metadata.json')
     
-    print(f"Matched population metadata saved to zipcode_metadata.json: {len(population_metadata)} regions")
-    print(f"Matched density metadata saved to melbourne_density_matched.json: {len(density_metadata)} regions")
+    print(f"Population metadata saved, contains {len(full_pop)} SA2 regions")
+    print(f"Population range: {min(full_pop.values())} - {max(full_pop.values())} people")
+    print(f"Density metadata saved, contains {len(full_dens)} SA2 regions")
+    print(f"Density range: {min(full_dens.values())} - {max(full_dens.values())} people/km²")
     
-    return population_metadata, density_metadata
+    return full_pop, full_dens, matched_pop, matched_dens
 
 def main():
     """Main function"""
+    parse_args(__doc__)
     print("Starting to process Melbourne API data...")
     
     # 1. Load API data
@@ -174,23 +113,22 @@ def main():
         api_data = load_api_data()  # Will fetch API and update melbourne_api_data.json
     except Exception as e:
         print(f"[WARN] API fetch failed, falling back to local file. Reason: {e}")
-        with open(LOCAL_JSON, 'r', encoding='utf-8') as f:
-            api_data = json.load(f)
+        api_data = load_json(LOCAL_JSON)
     print(f"Loaded {len(api_data)} SA2 regions from API data")
     
     # 2. Load boundary data
-    with open('melbourne_sa2_bounds_info.json', 'r', encoding='utf-8') as f:
-        bounds_data = json.load(f)
+    bounds_data = load_json('melbourne_sa2_bounds_info.json')
     
     # 3. Analyze data coverage
-    common_names = analyze_data_coverage(api_data, bounds_data)
+    api_names = [region['sa2_name'] for region in api_data]
+    common_names = analyze_data_coverage(api_names, bounds_data)
     
-    # 4. Create matched metadata
-    population_metadata, density_metadata = create_matched_metadata(api_data, common_names)
+    # 4. Find the latest year column
+    year_columns = sorted(col for col in api_data[0] if col.startswith('y'))
+    latest_year = year_columns[-1]
     
-    # 5. Also create complete metadata for reference
-    create_metadata_from_latest_year(api_data)
-    create_density_metadata(api_data)
+    # 5. Create matched and complete metadata
+    build_all_metadata(api_data, api_names, common_names, latest_year)
     
     print("\n=== Processing completed ===")
     print("Generated files:")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the Melbourne map data scripts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import requests
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib parser
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # fall back to hashlib.blake2b
+    xxhash = None
+
+# Write indented JSON instead of compact output (set by --pretty)
+PRETTY_JSON = False
+
+# Seconds a cached API response is reused without contacting the server
+API_CACHE_TTL = int(os.getenv("POP_API_CACHE_TTL", "600"))
+
+# Shared HTTP session so repeated requests reuse the pooled connection
+_session = requests.Session()
+
+# Span thresholds (degrees) and the zoom level used for spans up to each one.
+# A span above the last threshold falls through to the final zoom level.
+ZOOM_SPAN_THRESHOLDS = np.array([0.1, 0.2, 0.5, 1, 2, 5, 10])
+ZOOM_LEVELS = np.array([15, 14, 13, 12, 11, 10, 9, 8])
+
+def zoom_for_span(max_span):
+    """Estimate a Google Maps zoom level from the larger of the lng/lat spans
+
+    Accepts a scalar or an array of spans; arrays return an array of zooms.
+    """
+    zooms = ZOOM_LEVELS[np.searchsorted(ZOOM_SPAN_THRESHOLDS, max_span)]
+    if np.ndim(zooms) == 0:
+        return int(zooms)
+    return zooms
+
+def load_json(path):
+    """Read a JSON file, using orjson when it is available"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dump_json(obj, path, pretty=None):
+    """Write obj to a JSON file, using orjson when it is available
+
+    Output is compact unless pretty (default PRETTY_JSON) asks for a 2-space indent.
+    """
+    if pretty is None:
+        pretty = PRETTY_JSON
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=option))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        if pretty:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+        else:
+            json.dump(obj, f, separators=(',', ':'), ensure_ascii=True)
+
+def parse_args(description):
+    """Parse the command line options shared by the data scripts"""
+    global PRETTY_JSON
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--pretty', action='store_true',
+                        help='write indented JSON files for debugging')
+    args = parser.parse_args()
+    PRETTY_JSON = args.pretty
+    return args
+
+def file_digest(path):
+    """Return a hex content hash of a file, using xxh3 when xxhash is available"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if xxhash is not None:
+        return 'xxh3:' + xxhash.xxh3_64_hexdigest(data)
+    return 'blake2b:' + hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _load_fetch_meta(meta_path, url):
+    """Return the fetch metadata stored next to a cached response, or {} if it is for another URL"""
+    if not os.path.exists(meta_path):
+        return {}
+    try:
+        meta = load_json(meta_path)
+    except ValueError:
+        return {}
+    if not isinstance(meta, dict) or meta.get('url') != url:
+        return {}
+    return meta
+
+def _load_cached(cache_path, validate):
+    """Return the cached response body, or None if it is missing or fails validate"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        data = load_json(cache_path)
+        if validate is not None:
+            validate(data)
+    except Exception as e:
+        print(f"[WARN] Ignoring cached {cache_path}: {e}")
+        return None
+    return data
+
+def fetch_json(url, cache_path, timeout=20, max_age=API_CACHE_TTL, validate=None):
+    """Fetch JSON from url, caching the response body in cache_path
+
+    The URL, ETag and fetch time are kept in a cache_path + '.meta' sidecar, and
+    the cache is only used when it was fetched from the same URL. It is returned
+    as-is while younger than max_age seconds; after that the request is made
+    conditional on the stored ETag, so an unchanged response costs a 304 instead
+    of a full download. validate, if given, is called with the parsed data (cached
+    or fresh) and should raise on bad data; fresh data is validated
+    before the cache is overwritten.
+    """
+    meta_path = cache_path + '.meta'
+    meta = _load_fetch_meta(meta_path, url)
+    cached = _load_cached(cache_path, validate) if meta else None
+    
+    if cached is not None:
+        age = time.time() - meta.get('fetched_at', 0)
+        if age < max_age:
+            print(f"[INFO] Using cached {cache_path} from {url} ({age:.0f}s old)")
+            return cached
+    
+    headers = {}
+    if cached is not None and meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    
+    print(f"[INFO] Fetching {url}")
+    r = _session.get(url, timeout=timeout, headers=headers)
+    if r.status_code == 304 and cached is not None:
+        print(f"[INFO] Not modified, reusing {cache_path}")
+        meta['fetched_at'] = time.time()
+        dump_json(meta, meta_path)
+        return cached
+    r.raise_for_status()
+    
+    data = orjson.loads(r.content) if orjson is not None else r.json()
+    if validate is not None:
+        validate(data)
+    
+    dump_json(data, cache_path)
+    dump_json({'url': url, 'etag': r.headers.get('ETag'), 'fetched_at': time.time()}, meta_path)
+    print(f"[INFO] Written to {cache_path}")
+    
+    return data
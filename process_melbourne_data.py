@@ -4,107 +4,130 @@ Process Melbourne SA2 data
 Convert Shapefile to GeoJSON and filter the Melbourne area
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import geopandas as gpd
-import json
-import requests
+import hashlib
+import numpy as np
+import os
+import pyproj
+import shapely
+
+from map_utils import dump_json, fetch_json, parse_args
+
+# Read parameters for the SA2 Shapefile; they are part of the Parquet cache name so a
+# cache written with different parameters is never reused
+SA2_WHERE = "GCC_NAME21='Greater Melbourne'"
+SA2_COLUMNS = ['SA2_NAME21', 'GCC_NAME21']  # GCC_NAME21 must be read for the where clause
+SA2_DROP_COLUMNS = ['GCC_NAME21']  # ...but is not needed after the read
+SA2_TARGET_CRS = None  # keep the Shapefile's native CRS; only the GeoJSON output is reprojected
+
+# Coordinate system used by Google Maps
+WGS84 = 'EPSG:4326'
+
+def sa2_cache_path():
+    """Parquet copy of the filtered SA2 regions, much faster to load than going through GDAL"""
+    params = repr((SA2_WHERE, SA2_COLUMNS, SA2_DROP_COLUMNS, SA2_TARGET_CRS)).encode('utf-8')
+    return f"sa2_{hashlib.blake2b(params, digest_size=8).hexdigest()}.parquet"
 
 def load_sa2_data():
-    """Load SA2 Shapefile data"""
+    """Load Greater Melbourne SA2 regions from the Shapefile"""
     print("Loading SA2 Shapefile...")
     shapefile_path = r"D:\student\zfan_project\案例\resource\SA2_2021_AUST_SHP_GDA2020\SA2_2021_AUST_GDA2020.shp"
+    cache_path = sa2_cache_path()
+    
+    # Reuse the Parquet copy from a previous run unless the Shapefile is present and newer
+    if (os.path.exists(cache_path)
+            and (not os.path.exists(shapefile_path)
+                 or os.path.getmtime(cache_path) >= os.path.getmtime(shapefile_path))):
+        print(f"Using cached {cache_path}")
+        melbourne_gdf = gpd.read_parquet(cache_path)
+    else:
+        # Read only the Melbourne area; GDAL applies the filter while scanning the file.
+        # Only SA2_NAME21 is used downstream.
+        melbourne_gdf = gpd.read_file(
+            shapefile_path,
+            engine='pyogrio',
+            where=SA2_WHERE,
+            columns=SA2_COLUMNS,
+        )
+        melbourne_gdf = melbourne_gdf.drop(columns=SA2_DROP_COLUMNS)
+        
+        melbourne_gdf.to_parquet(cache_path)
     
-    # Read Shapefile
-    gdf = gpd.read_file(shapefile_path)
-    
-    print(f"Loaded a total of {len(gdf)} SA2 regions")
-    print("Data column names:", list(gdf.columns))
+    print(f"Loaded {len(melbourne_gdf)} Greater Melbourne SA2 regions")
+    print("Data column names:", list(melbourne_gdf.columns))
     
-    return gdf
+    return melbourne_gdf
 
-def explore_data(gdf):
+def explore_data(melbourne_gdf):
     """Explore data structure"""
     print("\n=== Data exploration ===")
     print("First 5 rows of data:")
-    print(gdf.head())
-    
-    print("\nUnique Greater Capital City areas:")
-    if 'GCC_NAME21' in gdf.columns:
-        gcc_names = gdf['GCC_NAME21'].unique()
-        print(gcc_names)
-    
-    print("\nNumber of Melbourne-related regions:")
-    melbourne_filter = gdf['GCC_NAME21'] == 'Greater Melbourne'
-    melbourne_count = melbourne_filter.sum()
-    print(f"Greater Melbourne area has {melbourne_count} SA2 regions")
-    
-    return melbourne_filter
-
-def filter_melbourne_data(gdf, melbourne_filter):
-    """Filter Melbourne area data"""
-    print("\n=== Filtering Melbourne data ===")
-    
-    # Filter Melbourne area
-    melbourne_gdf = gdf[melbourne_filter].copy()
-    
-    # Convert coordinate system to WGS84 (coordinate system used by Google Maps)
-    melbourne_gdf = melbourne_gdf.to_crs('EPSG:4326')
-    
-    print(f"After filtering, kept {len(melbourne_gdf)} Melbourne SA2 regions")
+    print(melbourne_gdf.head())
     
     # Show some SA2 name examples
     print("\nSample Melbourne SA2 regions:")
     sa2_names = melbourne_gdf['SA2_NAME21'].head(10).tolist()
     for name in sa2_names:
         print(f"  - {name}")
-    
-    return melbourne_gdf
 
 def create_geojson(melbourne_gdf):
     """Create GeoJSON file"""
     print("\n=== Creating GeoJSON ===")
     
-    # Convert to GeoJSON format
-    geojson = melbourne_gdf.to_json()
+    # Convert coordinate system to WGS84; the map needs every polygon vertex reprojected
+    melbourne_gdf = melbourne_gdf.to_crs(WGS84)
     
-    # Save GeoJSON file
-    with open('melbourne_sa2_boundaries.json', 'w', encoding='utf-8') as f:
-        f.write(geojson)
+    # Write GeoJSON straight from OGR instead of building the whole document as a string.
+    # RFC7946 output rounds coordinates to 7 decimals (~1 cm) and drops the crs member;
+    # WRITE_NAME=NO drops the layer name, keeping the file the browser downloads small.
+    melbourne_gdf.to_file(
+        'melbourne_sa2_boundaries.json',
+        driver='GeoJSON',
+        engine='pyogrio',
+        layer_options={'RFC7946': 'YES', 'WRITE_NAME': 'NO'},
+    )
     
     print("GeoJSON file saved as: melbourne_sa2_boundaries.json")
-    
-    return json.loads(geojson)
 
 def create_bounds_info(melbourne_gdf):
     """Create boundary info file (simulate zipcode_bound_info.json format)"""
     print("\n=== Creating boundary information ===")
     
-    bounds_info = {"data": {}}
-    
-    for idx, row in melbourne_gdf.iterrows():
-        sa2_name = row['SA2_NAME21']
-        geometry = row['geometry']
-        
-        # Calculate bounding box
-        bounds = geometry.bounds  # (minx, miny, maxx, maxy)
-        
-        # Calculate centroid
-        centroid = geometry.centroid
-        
-        # Format: [min_lng, min_lat, max_lng, max_lat, center_lng, center_lat]
-        bounds_info["data"][sa2_name] = [
-            bounds[0],  # min_lng
-            bounds[1],  # min_lat  
-            bounds[2],  # max_lng
-            bounds[3],  # max_lat
-            centroid.x, # center_lng
-            centroid.y  # center_lat
-        ]
+    # Compute all bounding boxes (minx, miny, maxx, maxy) and centroids in one pass
+    # (shapely directly, as GeoSeries.centroid warns on the geographic GDA2020 CRS
+    # even though planar centroids are what this file has always held)
+    b = melbourne_gdf.geometry.bounds.to_numpy()
+    c = shapely.centroid(melbourne_gdf.geometry.to_numpy())
+    minx, miny, maxx, maxy = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    cx = shapely.get_x(c)
+    cy = shapely.get_y(c)
+    names = melbourne_gdf['SA2_NAME21'].to_numpy()
+    
+    # Reproject just these coordinates to WGS84 instead of every polygon vertex
+    if melbourne_gdf.crs != WGS84:
+        tr = pyproj.Transformer.from_crs(melbourne_gdf.crs, WGS84, always_xy=True)
+        minx, miny = tr.transform(minx, miny)
+        maxx, maxy = tr.transform(maxx, maxy)
+        cx, cy = tr.transform(cx, cy)
+    
+    # Format: [min_lng, min_lat, max_lng, max_lat, center_lng, center_lat]
+    coords = np.column_stack([minx, miny, maxx, maxy, cx, cy])
+    bounds_info = {"data": dict(zip(names.tolist(), coords.tolist()))}
     
     # Save boundary info file
-    with open('melbourne_sa2_bounds_info.json', 'w', encoding='utf-8') as f:
-        json.dump(bounds_info, f, indent=2, ensure_ascii=False)
+    dump_json(bounds_info, 'melbourne_sa2_bounds_info.json')
+    
+    # Compact binary copy for machine consumers; float32 keeps ~1 m precision
+    np.savez_compressed(
+        'melbourne_sa2_bounds_info.npz',
+        names=names.astype(str),
+        coords=coords.astype(np.float32),
+    )
     
     print(f"Boundary information file saved as: melbourne_sa2_bounds_info.json")
+    print("Binary boundary information saved as: melbourne_sa2_bounds_info.npz")
     print(f"Contains boundary information for {len(bounds_info['data'])} SA2 regions")
     
     return bounds_info
@@ -116,21 +139,13 @@ def fetch_melbourne_population_data():
     try:
         # Get all Melbourne data
         url = 'https://vic-population-api.onrender.com/melbourne-city'
-        response = requests.get(url, timeout=30)
         
-        if response.status_code == 200:
-            data = response.json()
-            print("Successfully fetched API data")
-            print(f"Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-            
-            # Save raw API data
-            with open('melbourne_api_data.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            return data
-        else:
-            print(f"API request failed: {response.status_code}")
-            return None
+        # Raw API data is saved to melbourne_api_data.json
+        data = fetch_json(url, 'melbourne_api_data.json', timeout=30)
+        print("Loaded API data")
+        print(f"Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+        
+        return data
             
     except Exception as e:
         print(f"Error fetching API data: {e}")
@@ -138,30 +153,31 @@ def fetch_melbourne_population_data():
 
 def main():
     """Main function"""
+    parse_args(__doc__)
     print("Starting to process Melbourne SA2 data...")
     
-    # 1. Load Shapefile data
-    gdf = load_sa2_data()
-    
-    # 2. Explore data
-    melbourne_filter = explore_data(gdf)
-    
-    # 3. Filter Melbourne data
-    melbourne_gdf = filter_melbourne_data(gdf, melbourne_filter)
-    
-    # 4. Create GeoJSON
-    geojson_data = create_geojson(melbourne_gdf)
-    
-    # 5. Create boundary information
-    bounds_info = create_bounds_info(melbourne_gdf)
-    
-    # 6. Fetch population data
-    api_data = fetch_melbourne_population_data()
+    # 1. Fetch population data in the background while loading Melbourne Shapefile data
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_api = ex.submit(fetch_melbourne_population_data)
+        melbourne_gdf = load_sa2_data()
+        
+        # 2. Explore data
+        explore_data(melbourne_gdf)
+        
+        # 3. Create GeoJSON
+        create_geojson(melbourne_gdf)
+        
+        # 4. Create boundary information
+        bounds_info = create_bounds_info(melbourne_gdf)
+        
+        # 5. Wait for population data
+        api_data = f_api.result()
     
     print("\n=== Processing completed ===")
     print("Generated files:")
     print("  - melbourne_sa2_boundaries.json (GeoJSON boundaries)")
     print("  - melbourne_sa2_bounds_info.json (boundary information)")
+    print("  - melbourne_sa2_bounds_info.npz (binary boundary information)")
     print("  - melbourne_api_data.json (API population data)")
     
     print("\nNext step: Integrate these files into the website")